@@ -13,40 +13,66 @@
 #
 
 import collections as co
+import concurrent.futures as cf
 import csv
 import difflib
+import functools as ft
 import itertools as it
 import math as m
+import operator as op
 import os
 import re
 import shlex
+import shutil
 import subprocess as sp
+import tempfile
 
 
 NM_PATH = ['nm']
 NM_TYPES = 'dDbB'
 OBJDUMP_PATH = ['objdump']
 
+# these are matched against every line of objdump output, so compile once,
+# note these operate on raw bytes to avoid decoding the (large) dwarf dumps
+LINE_PATTERN = re.compile(
+    rb'^\s+(?P<no>[0-9]+)'
+        rb'(?:\s+(?P<dir>[0-9]+))?'
+        rb'\s+.*'
+        rb'\s+(?P<path>[^\s]+)$')
+# most dwarf info lines are none of these, so we check for the attribute with
+# a cheap substring test before reaching for these
+TAG_PATTERN = re.compile(rb'DW_TAG_[a-z_]+')
+NAME_PATTERN = re.compile(rb':\s*(?P<name>[^:\s]+)\s*$')
+FILE_PATTERN = re.compile(rb':\s*(?P<file>[0-9]+)\s*$')
+
+# accepted spellings of +-infinity, after removing whitespace
+INF_STRS = frozenset(['∞', 'inf', '+∞', '+inf'])
+NINF_STRS = frozenset(['-∞', '-inf'])
+
 
 # integer fields
 class Int(co.namedtuple('Int', 'x')):
     __slots__ = ()
     def __new__(cls, x=0):
-        if isinstance(x, Int):
-            return x
+        # fast path for plain ints, which is most of them
+        if type(x) is int:
+            return tuple.__new__(cls, (x,))
         if isinstance(x, str):
             try:
                 x = int(x, 0)
             except ValueError:
                 # also accept +-∞ and +-inf
-                if re.match('^\s*\+?\s*(?:∞|inf)\s*$', x):
+                x_ = ''.join(x.split())
+                if x_ in INF_STRS:
                     x = m.inf
-                elif re.match('^\s*-\s*(?:∞|inf)\s*$', x):
+                elif x_ in NINF_STRS:
                     x = -m.inf
                 else:
                     raise
+        elif isinstance(x, Int):
+            return x
         assert isinstance(x, int) or m.isinf(x), x
-        return super().__new__(cls, x)
+        return tuple.__new__(cls, (x,))
 
     def __str__(self):
         if self.x == m.inf:
@@ -63,9 +89,26 @@ class Int(co.namedtuple('Int', 'x')):
     def __float__(self):
         return float(self.x)
 
+    # sizes tend to repeat a lot in tables, so we cache the formatted
+    # strings keyed by the underlying value
+    @staticmethod
+    @ft.lru_cache(4096)
+    def _table(x):
+        return '%7s' % (Int(x),)
+
+    @staticmethod
+    @ft.lru_cache(4096)
+    def _diff(diff):
+        if diff == +m.inf:
+            return '%7s' % '+∞'
+        elif diff == -m.inf:
+            return '%7s' % '-∞'
+        else:
+            return '%+7d' % diff
+
     none = '%7s' % '-'
     def table(self):
-        return '%7s' % (self,)
+        return Int._table(self.x)
 
     diff_none = '%7s' % '-'
     diff_table = table
@@ -73,13 +116,7 @@ class Int(co.namedtuple('Int', 'x')):
     def diff_diff(self, other):
         new = self.x if self else 0
         old = other.x if other else 0
-        diff = new - old
-        if diff == +m.inf:
-            return '%7s' % '+∞'
-        elif diff == -m.inf:
-            return '%7s' % '-∞'
-        else:
-            return '%+7d' % diff
+        return Int._diff(new - old)
 
     def ratio(self, other):
         new = self.x if self else 0
@@ -97,14 +134,16 @@ class Int(co.namedtuple('Int', 'x')):
         else:
             return (new-old) / old
 
+    # note these use _make to skip __new__'s parsing, we already know x is
+    # an int or +-inf
     def __add__(self, other):
-        return self.__class__(self.x + other.x)
+        return self._make((self.x + other.x,))
 
     def __sub__(self, other):
-        return self.__class__(self.x - other.x)
+        return self._make((self.x - other.x,))
 
     def __mul__(self, other):
-        return self.__class__(self.x * other.x)
+        return self._make((self.x * other.x,))
 
 # data size results
 class DataResult(co.namedtuple('DataResult', [
@@ -121,8 +160,8 @@ class DataResult(co.namedtuple('DataResult', [
             Int(size))
 
     def __add__(self, other):
-        return DataResult(self.file, self.function,
-            self.size + other.size)
+        return self._make((self.file, self.function,
+            self.size + other.size))
 
 
 def openio(path, mode='r', buffering=-1):
@@ -135,177 +174,269 @@ def openio(path, mode='r', buffering=-1):
     else:
         return open(path, mode, buffering)
 
-def collect(obj_paths, *,
+def readlines(f, size=1024*1024):
+    # read a (potentially very large) stream in big chunks and split lines in
+    # C, this avoids readline's per-line overhead without needing to hold the
+    # whole stream in memory
+    fd = f.fileno()
+    tail = b''
+    while True:
+        chunk = os.read(fd, size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+def collect_job(path, *,
         nm_path=NM_PATH,
         nm_types=NM_TYPES,
         objdump_path=OBJDUMP_PATH,
-        sources=None,
+        nm_exe=None,
+        objdump_exe=None,
         everything=False,
         **args):
-    size_pattern = re.compile(
-        '^(?P<size>[0-9a-fA-F]+)' +
-        ' (?P<type>[%s])' % re.escape(nm_types) +
-        ' (?P<func>.+?)$')
-    line_pattern = re.compile(
-        '^\s+(?P<no>[0-9]+)'
-            '(?:\s+(?P<dir>[0-9]+))?'
-            '\s+.*'
-            '\s+(?P<path>[^\s]+)$')
-    info_pattern = re.compile(
-        '^(?:.*(?P<tag>DW_TAG_[a-z_]+).*'
-            '|.*DW_AT_name.*:\s*(?P<name>[^:\s]+)\s*'
-            '|.*DW_AT_decl_file.*:\s*(?P<file>[0-9]+)\s*)$')
-
-    results = []
-    for path in obj_paths:
-        # guess the source, if we have debug-info we'll replace this later
-        file = re.sub('(\.o)?$', '.c', path, 1)
-
-        # find symbol sizes
-        results_ = []
-        # note nm-path may contain extra args
-        cmd = nm_path + ['--size-sort', path]
-        if args.get('verbose'):
-            print(' '.join(shlex.quote(c) for c in cmd))
-        proc = sp.Popen(cmd,
-            stdout=sp.PIPE,
-            stderr=sp.PIPE if not args.get('verbose') else None,
-            universal_newlines=True,
-            errors='replace',
-            close_fds=False)
-        for line in proc.stdout:
-            m = size_pattern.match(line)
+    # guess the source, if we have debug-info we'll replace this later
+    file = re.sub('(\.o)?$', '.c', path, 1)
+
+    # find symbol sizes
+    results_ = []
+    # note nm-path may contain extra args
+    cmd = nm_path + ['--size-sort', path]
+    if args.get('verbose'):
+        print(' '.join(shlex.quote(c) for c in cmd))
+    proc = sp.Popen(cmd,
+        executable=nm_exe,
+        stdout=sp.PIPE,
+        stderr=sp.PIPE if not args.get('verbose') else None,
+        universal_newlines=True,
+        errors='replace',
+        close_fds=False)
+    # reading everything at once lets splitlines do the work in C, and
+    # also drains stderr so a noisy tool can't block us
+    out, err = proc.communicate()
+    for line in out.splitlines():
+        # nm's output is just '<size> <type> <name>', so splitting on
+        # whitespace is enough, no need for a regex
+        parts = line.split(None, 2)
+        if len(parts) == 3 and parts[1] in nm_types:
+            func = sys.intern(parts[2].rstrip())
+            # discard internal functions
+            if not everything and func.startswith('__'):
+                continue
+            results_.append(DataResult(
+                file, func,
+                int(parts[0], 16)))
+    if proc.returncode != 0:
+        if not args.get('verbose'):
+            sys.stdout.write(err)
+        sys.exit(-1)
+
+
+    # try to figure out the source file if we have debug-info
+    dirs = {}
+    files = {}
+    # note objdump-path may contain extra args
+    cmd = objdump_path + ['--dwarf=rawline', path]
+    if args.get('verbose'):
+        print(' '.join(shlex.quote(c) for c in cmd))
+    proc = sp.Popen(cmd,
+        executable=objdump_exe,
+        stdout=sp.PIPE,
+        stderr=sp.PIPE if not args.get('verbose') else None,
+        close_fds=False)
+    out, err = proc.communicate()
+    for line in out.splitlines():
+        # note that files contain references to dirs, which we
+        # dereference as soon as we see them as each file table follows a
+        # dir table
+        m = LINE_PATTERN.match(line)
+        if m:
+            if not m.group('dir'):
+                # found a directory entry
+                dirs[int(m.group('no'))] = m.group('path').decode(
+                    'utf8', errors='replace')
+            else:
+                # found a file entry, note these paths end up repeated
+                # across many symbols, so intern them
+                dir = int(m.group('dir'))
+                path_ = m.group('path').decode('utf8', errors='replace')
+                if dir in dirs:
+                    files[int(m.group('no'))] = sys.intern(os.path.join(
+                        dirs[dir],
+                        path_))
+                else:
+                    files[int(m.group('no'))] = sys.intern(path_)
+    if proc.returncode != 0:
+        if not args.get('verbose'):
+            sys.stdout.write(err.decode('utf8', errors='replace'))
+        # do nothing on error, we don't need objdump to work, source files
+        # may just be inaccurate
+        pass
+
+    defs = {}
+    is_func = False
+    f_name = None
+    f_file = None
+    # note objdump-path may contain extra args
+    cmd = objdump_path + ['--dwarf=info', path]
+    if args.get('verbose'):
+        print(' '.join(shlex.quote(c) for c in cmd))
+    # we only read stdout until EOF here, so send stderr to a temporary file
+    # instead of a pipe, otherwise a noisy tool could block on a full pipe
+    err = tempfile.TemporaryFile() if not args.get('verbose') else None
+    proc = sp.Popen(cmd,
+        executable=objdump_exe,
+        stdout=sp.PIPE,
+        stderr=err,
+        bufsize=0,
+        close_fds=False)
+    # the dwarf info dump can get very large, so stream this one
+    for line in readlines(proc.stdout):
+        # state machine here to find definitions
+        if b'DW_TAG_' in line:
+            m = TAG_PATTERN.search(line)
             if m:
-                func = m.group('func')
-                # discard internal functions
-                if not everything and func.startswith('__'):
-                    continue
-                results_.append(DataResult(
-                    file, func,
-                    int(m.group('size'), 16)))
-        proc.wait()
-        if proc.returncode != 0:
-            if not args.get('verbose'):
-                for line in proc.stderr:
-                    sys.stdout.write(line)
-            sys.exit(-1)
-
-
-        # try to figure out the source file if we have debug-info
-        dirs = {}
-        files = {}
-        # note objdump-path may contain extra args
-        cmd = objdump_path + ['--dwarf=rawline', path]
-        if args.get('verbose'):
-            print(' '.join(shlex.quote(c) for c in cmd))
-        proc = sp.Popen(cmd,
-            stdout=sp.PIPE,
-            stderr=sp.PIPE if not args.get('verbose') else None,
-            universal_newlines=True,
-            errors='replace',
-            close_fds=False)
-        for line in proc.stdout:
-            # note that files contain references to dirs, which we
-            # dereference as soon as we see them as each file table follows a
-            # dir table
-            m = line_pattern.match(line)
+                if is_func:
+                    defs[f_name] = files.get(f_file, '?')
+                is_func = (m.group() == b'DW_TAG_subprogram')
+        elif b'DW_AT_name' in line:
+            m = NAME_PATTERN.search(line)
             if m:
-                if not m.group('dir'):
-                    # found a directory entry
-                    dirs[int(m.group('no'))] = m.group('path')
-                else:
-                    # found a file entry
-                    dir = int(m.group('dir'))
-                    if dir in dirs:
-                        files[int(m.group('no'))] = os.path.join(
-                            dirs[dir],
-                            m.group('path'))
-                    else:
-                        files[int(m.group('no'))] = m.group('path')
-        proc.wait()
-        if proc.returncode != 0:
-            if not args.get('verbose'):
-                for line in proc.stderr:
-                    sys.stdout.write(line)
-            # do nothing on error, we don't need objdump to work, source files
-            # may just be inaccurate
-            pass
-
-        defs = {}
-        is_func = False
-        f_name = None
-        f_file = None
-        # note objdump-path may contain extra args
-        cmd = objdump_path + ['--dwarf=info', path]
-        if args.get('verbose'):
-            print(' '.join(shlex.quote(c) for c in cmd))
-        proc = sp.Popen(cmd,
-            stdout=sp.PIPE,
-            stderr=sp.PIPE if not args.get('verbose') else None,
-            universal_newlines=True,
-            errors='replace',
-            close_fds=False)
-        for line in proc.stdout:
-            # state machine here to find definitions
-            m = info_pattern.match(line)
+                f_name = m.group('name').decode('utf8', errors='replace')
+        elif b'DW_AT_decl_file' in line:
+            m = FILE_PATTERN.search(line)
             if m:
-                if m.group('tag'):
-                    if is_func:
-                        defs[f_name] = files.get(f_file, '?')
-                    is_func = (m.group('tag') == 'DW_TAG_subprogram')
-                elif m.group('name'):
-                    f_name = m.group('name')
-                elif m.group('file'):
-                    f_file = int(m.group('file'))
-        if is_func:
-            defs[f_name] = files.get(f_file, '?')
-        proc.wait()
-        if proc.returncode != 0:
-            if not args.get('verbose'):
-                for line in proc.stderr:
-                    sys.stdout.write(line)
-            # do nothing on error, we don't need objdump to work, source files
-            # may just be inaccurate
-            pass
+                f_file = int(m.group('file'))
+    if is_func:
+        defs[f_name] = files.get(f_file, '?')
+    proc.stdout.close()
+    proc.wait()
+    if proc.returncode != 0:
+        if not args.get('verbose'):
+            err.seek(0)
+            sys.stdout.write(err.read().decode('utf8', errors='replace'))
+        # do nothing on error, we don't need objdump to work, source files
+        # may just be inaccurate
+        pass
+    if err is not None:
+        err.close()
+
+    # index defs by their name without any optimization suffixes
+    # (.isra.0, .part.1, .constprop.2, etc), this resolves most mismatches
+    # without needing to fall back to difflib
+    defs_ = {}
+    for name, file_ in defs.items():
+        defs_.setdefault(name.split('.', 1)[0], file_)
+    # difflib is slow, so only run it once per unique symbol
+    fuzzy = {}
 
-        for r in results_:
-            # find best matching debug symbol, this may be slightly different
-            # due to optimizations
-            if defs:
-                # exact match? avoid difflib if we can for speed
-                if r.function in defs:
-                    file = defs[r.function]
-                else:
-                    _, file = max(
-                        defs.items(),
-                        key=lambda d: difflib.SequenceMatcher(None,
-                            d[0],
-                            r.function, False).ratio())
+    results = []
+    for r in results_:
+        # find best matching debug symbol, this may be slightly different
+        # due to optimizations
+        if defs:
+            base = r.function.split('.', 1)[0]
+            # exact match? avoid difflib if we can for speed
+            if r.function in defs:
+                file = defs[r.function]
+            elif base in defs:
+                file = defs[base]
+            elif base in defs_:
+                file = defs_[base]
+            elif r.function in fuzzy:
+                file = fuzzy[r.function]
             else:
-                file = r.file
+                _, file = max(
+                    defs.items(),
+                    key=lambda d: difflib.SequenceMatcher(None,
+                        d[0],
+                        r.function, False).ratio())
+                fuzzy[r.function] = file
+        else:
+            file = r.file
 
-            # ignore filtered sources
-            if sources is not None:
-                if not any(
-                        os.path.abspath(file) == os.path.abspath(s)
-                        for s in sources):
-                    continue
-            else:
-                # default to only cwd
-                if not everything and not os.path.commonpath([
-                        os.getcwd(),
-                        os.path.abspath(file)]) == os.getcwd():
-                    continue
+        results.append(r._replace(file=file))
 
-            # simplify path
-            if os.path.commonpath([
-                    os.getcwd(),
-                    os.path.abspath(file)]) == os.getcwd():
-                file = os.path.relpath(file)
-            else:
-                file = os.path.abspath(file)
+    return results
+
+def collect(obj_paths, *,
+        nm_types=NM_TYPES,
+        sources=None,
+        everything=False,
+        jobs=None,
+        **args):
+    # automatic job detection?
+    if jobs == 0:
+        jobs = len(os.sched_getaffinity(0))
+
+    nm_types = frozenset(nm_types)
+
+    # resolve our executables to full paths once, this lets subprocess spawn
+    # them with posix_spawn (vfork) instead of fork+exec
+    nm_exe = shutil.which(args.get('nm_path', NM_PATH)[0])
+    objdump_exe = shutil.which(args.get('objdump_path', OBJDUMP_PATH)[0])
+
+    # the heavy lifting here is done by nm/objdump, so threads are enough to
+    # process multiple object files in parallel
+    if jobs is not None:
+        with cf.ThreadPoolExecutor(jobs) as p:
+            results_ = list(it.chain.from_iterable(p.map(
+                lambda path: collect_job(path,
+                    nm_types=nm_types,
+                    nm_exe=nm_exe,
+                    objdump_exe=objdump_exe,
+                    everything=everything,
+                    **args),
+                obj_paths)))
+    else:
+        results_ = []
+        for path in obj_paths:
+            results_.extend(collect_job(path,
+                nm_types=nm_types,
+                nm_exe=nm_exe,
+                objdump_exe=objdump_exe,
+                everything=everything,
+                **args))
+
+    # these don't change between symbols, so only resolve them once
+    cwd = os.getcwd()
+    cwd_prefix = os.path.join(cwd, '')
+    def under_cwd(path):
+        # equivalent to os.path.commonpath([cwd, path]) == cwd for absolute
+        # paths, but without splitting either path
+        return path == cwd or path.startswith(cwd_prefix)
+
+    if sources is not None:
+        sources = {os.path.abspath(s) for s in sources}
+    abspaths = {}
+
+    results = []
+    for r in results_:
+        file = r.file
+        if file not in abspaths:
+            abspaths[file] = os.path.abspath(file)
+        abspath = abspaths[file]
+        in_cwd = under_cwd(abspath)
+
+        # ignore filtered sources
+        if sources is not None:
+            if abspath not in sources:
+                continue
+        else:
+            # default to only cwd
+            if not everything and not in_cwd:
+                continue
 
-            results.append(r._replace(file=file))
+        # simplify path
+        if in_cwd:
+            file = os.path.relpath(abspath, cwd)
+        else:
+            file = abspath
+
+        results.append(r._replace(file=file))
 
     return results
 
@@ -330,20 +461,14 @@ def fold(Result, results, *,
                 results_.append(r)
         results = results_
 
-    # organize results into conflicts
-    folding = co.OrderedDict()
+    # merge conflicts as we find them, note dicts preserve insertion order
+    folded = {}
     for r in results:
         name = tuple(getattr(r, k) for k in by)
-        if name not in folding:
-            folding[name] = []
-        folding[name].append(r)
+        r_ = folded.get(name)
+        folded[name] = r if r_ is None else r_ + r
 
-    # merge conflicts
-    folded = []
-    for name, rs in folding.items():
-        folded.append(sum(rs[1:], start=rs[0]))
-
-    return folded
+    return list(folded.values())
 
 def table(Result, results, diff_results=None, *,
         by=None,
@@ -375,23 +500,31 @@ def table(Result, results, diff_results=None, *,
         for r in diff_results or []}
     names = list(table.keys() | diff_table.keys())
 
+    # find ratios once, these are needed both for sorting and for the
+    # entries themselves
+    if diff_results is not None:
+        ratios_ = {
+            n: [types[k].ratio(
+                    getattr(table.get(n), k, None),
+                    getattr(diff_table.get(n), k, None))
+                for k in fields]
+            for n in names}
+
     # sort again, now with diff info, note that python's sort is stable
     names.sort()
     if diff_results is not None:
-        names.sort(key=lambda n: tuple(
-            types[k].ratio(
-                getattr(table.get(n), k, None),
-                getattr(diff_table.get(n), k, None))
-            for k in fields),
-            reverse=True)
+        names.sort(key=ratios_.__getitem__, reverse=True)
     if sort:
         for k, reverse in reversed(sort):
-            names.sort(
-                key=lambda n: tuple(
+            ks = [k] if k else [k for k in Result._sort if k in fields]
+            keys = {
+                n: tuple(
                     (getattr(table[n], k),)
                     if getattr(table.get(n), k, None) is not None else ()
-                    for k in ([k] if k else [
-                        k for k in Result._sort if k in fields])),
+                    for k in ks)
+                for n in names}
+            names.sort(
+                key=keys.__getitem__,
                 reverse=reverse ^ (not k or k in Result._fields))
 
 
@@ -476,11 +609,7 @@ def table(Result, results, diff_results=None, *,
                 ratios = None
             else:
                 diff_r = diff_table.get(name)
-                ratios = [
-                    types[k].ratio(
-                        getattr(r, k, None),
-                        getattr(diff_r, k, None))
-                    for k in fields]
+                ratios = ratios_[name]
                 if not all_ and not any(ratios):
                     continue
             lines.append(table_entry(name, r, diff_r, ratios))
@@ -502,10 +631,10 @@ def table(Result, results, diff_results=None, *,
     # find the best widths, note that column 0 contains the names and column -1
     # the ratios, so those are handled a bit differently
     widths = [
-        ((max(it.chain([w], (len(l[i]) for l in lines)))+1+4-1)//4)*4-1
-        for w, i in zip(
+        ((max(w, max(map(len, col)))+1+4-1)//4)*4-1
+        for w, col in zip(
             it.chain([23], it.repeat(7)),
-            range(len(lines[0])-1))]
+            it.islice(zip(*lines), len(lines[0])-1))]
 
     # print our table
     for line in lines:
@@ -528,14 +657,25 @@ def main(obj_paths, *,
     else:
         results = []
         with openio(args['use']) as f:
-            reader = csv.DictReader(f, restval='')
+            # map our fields to column indices once, rather than building a
+            # dict for every row
+            reader = csv.reader(f)
+            header = {k: i for i, k in enumerate(next(reader, []))}
+            by_ = [(k, header[k])
+                for k in DataResult._by
+                if k in header]
+            fields_ = [(k, header['data_'+k])
+                for k in DataResult._fields
+                if 'data_'+k in header]
             for r in reader:
+                if not r:
+                    continue
                 try:
                     results.append(DataResult(
-                        **{k: r[k] for k in DataResult._by
-                            if k in r and r[k].strip()},
-                        **{k: r['data_'+k] for k in DataResult._fields
-                            if 'data_'+k in r and r['data_'+k].strip()}))
+                        **{k: r[i] for k, i in by_
+                            if i < len(r) and r[i].strip()},
+                        **{k: r[i] for k, i in fields_
+                            if i < len(r) and r[i].strip()}))
                 except TypeError:
                     pass
 
@@ -547,42 +687,42 @@ def main(obj_paths, *,
     if sort:
         for k, reverse in reversed(sort):
             results.sort(
-                key=lambda r: tuple(
-                    (getattr(r, k),) if getattr(r, k) is not None else ()
-                    for k in ([k] if k else DataResult._sort)),
+                key=op.attrgetter(*([k] if k else DataResult._sort)),
                 reverse=reverse ^ (not k or k in DataResult._fields))
 
     # write results to CSV
     if args.get('output'):
         with openio(args['output'], 'w') as f:
-            writer = csv.DictWriter(f,
-                (by if by is not None else DataResult._by)
-                + ['data_'+k for k in (
-                    fields if fields is not None else DataResult._fields)])
-            writer.writeheader()
-            for r in results:
-                writer.writerow(
-                    {k: getattr(r, k) for k in (
-                        by if by is not None else DataResult._by)}
-                    | {'data_'+k: getattr(r, k) for k in (
-                        fields if fields is not None else DataResult._fields)})
+            by_ = by if by is not None else DataResult._by
+            fields_ = fields if fields is not None else DataResult._fields
+            writer = csv.writer(f)
+            writer.writerow(by_ + ['data_'+k for k in fields_])
+            getters = [op.attrgetter(k) for k in it.chain(by_, fields_)]
+            writer.writerows([g(r) for g in getters] for r in results)
 
     # find previous results?
     if args.get('diff'):
         diff_results = []
         try:
             with openio(args['diff']) as f:
-                reader = csv.DictReader(f, restval='')
+                reader = csv.reader(f)
+                header = {k: i for i, k in enumerate(next(reader, []))}
+                by_ = [(k, header[k])
+                    for k in DataResult._by
+                    if k in header]
+                fields_ = [(k, header['data_'+k])
+                    for k in DataResult._fields
+                    if 'data_'+k in header]
                 for r in reader:
-                    if not any('data_'+k in r and r['data_'+k].strip()
-                            for k in DataResult._fields):
+                    if not any(i < len(r) and r[i].strip()
+                            for _, i in fields_):
                         continue
                     try:
                         diff_results.append(DataResult(
-                            **{k: r[k] for k in DataResult._by
-                                if k in r and r[k].strip()},
-                            **{k: r['data_'+k] for k in DataResult._fields
-                                if 'data_'+k in r and r['data_'+k].strip()}))
+                            **{k: r[i] for k, i in by_
+                                if i < len(r) and r[i].strip()},
+                            **{k: r[i] for k, i in fields_
+                                if i < len(r) and r[i].strip()}))
                     except TypeError:
                         pass
         except FileNotFoundError:
@@ -682,6 +822,12 @@ if __name__ == "__main__":
         '--everything',
         action='store_true',
         help="Include builtin and libc specific symbols.")
+    parser.add_argument(
+        '-j', '--jobs',
+        nargs='?',
+        type=lambda x: int(x, 0),
+        const=0,
+        help="Number of threads to use. 0 spawns one thread per core.")
     parser.add_argument(
         '--nm-types',
         default=NM_TYPES,
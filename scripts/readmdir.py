@@ -4,6 +4,7 @@ import struct
 import binascii
 import sys
 import itertools as it
+import mmap
 
 TAG_TYPES = {
     'splice':       (0x700, 0x400),
@@ -28,6 +29,37 @@ TAG_TYPES = {
     'fcrc':         (0x7ff, 0x5ff),
 }
 
+# reverse mapping of (mask, type) -> name, for typerepr
+TAG_NAMES = {v: k for k, v in TAG_TYPES.items()}
+
+# translation table mapping non-printable bytes to '.', for hex dumps
+PRINTABLE = bytes(c if c >= 0x20 and c <= 0x7e else ord('.')
+    for c in range(256))
+
+def printable(data):
+    return data.translate(PRINTABLE).decode('ascii')
+
+# prebuilt structs for the fields we decode for every tag/block
+BE32 = struct.Struct('>I')
+LE32 = struct.Struct('<I')
+
+def mmap_disk(f):
+    # mapping the disk avoids a seek+read per block, but only works for
+    # non-empty regular files, block devices report a size of zero, so
+    # return None to fall back to reading
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return None
+
+def read_block(f, disk, block_size, block):
+    if disk is not None:
+        data = disk[block*block_size : (block+1)*block_size]
+    else:
+        f.seek(block*block_size)
+        data = f.read(block_size)
+    return data.ljust(block_size, b'\xff')
+
 class Tag:
     def __init__(self, *args):
         if len(args) == 1:
@@ -52,6 +84,12 @@ class Tag:
         else:
             assert False
 
+        # tags are immutable and these fields are accessed constantly, so
+        # decode them once here rather than in properties
+        self.type = (self.tag & 0x7ff00000) >> 20
+        self.id   = (self.tag & 0x000ffc00) >> 10
+        self.size = (self.tag & 0x000003ff) >> 0
+
     @property
     def isvalid(self):
         return not bool(self.tag & 0x80000000)
@@ -68,10 +106,6 @@ class Tag:
     def isunique(self):
         return not bool(self.tag & 0x10000000)
 
-    @property
-    def type(self):
-        return (self.tag & 0x7ff00000) >> 20
-
     @property
     def type1(self):
         return (self.tag & 0x70000000) >> 20
@@ -80,14 +114,6 @@ class Tag:
     def type3(self):
         return (self.tag & 0x7ff00000) >> 20
 
-    @property
-    def id(self):
-        return (self.tag & 0x000ffc00) >> 10
-
-    @property
-    def size(self):
-        return (self.tag & 0x000003ff) >> 0
-
     @property
     def dsize(self):
         return 4 + (self.size if self.size != 0x3ff else 0)
@@ -101,6 +127,11 @@ class Tag:
         return struct.unpack('b', struct.pack('B', self.chunk))[0]
 
     def is_(self, type):
+        # fast path for plain type names, which is most of them
+        if type in TAG_TYPES:
+            mask, type_ = TAG_TYPES[type]
+            return (self.type & mask) == type_
+
         try:
             if ' ' in type:
                 type1, type3 = type.split()
@@ -135,11 +166,10 @@ class Tag:
         else:
             crc_status = ''
 
-        reverse_types = {v: k for k, v in TAG_TYPES.items()}
         for prefix in range(12):
             mask = 0x7ff & ~((1 << prefix)-1)
-            if (mask, self.type & mask) in reverse_types:
-                type = reverse_types[mask, self.type & mask]
+            type = TAG_NAMES.get((mask, self.type & mask))
+            if type is not None:
                 if prefix > 0:
                     return '%s %#x%s' % (
                         type, self.type & ((1 << prefix)-1), crc_status)
@@ -181,42 +211,58 @@ class MetadataPair:
             self.ids  = self.pair[0].ids
             self.log  = self.pair[0].log
             self.all_ = self.pair[0].all_
+            self.rlog = self.pair[0].rlog
+            self.lookups = self.pair[0].lookups
             return
 
         self.pair = [self]
         self.data = blocks[0]
+        self.lookups = {}
         block = self.data
 
-        self.rev, = struct.unpack('<I', block[0:4])
+        self.rev, = LE32.unpack_from(block, 0)
         crc = binascii.crc32(block[0:4])
         fcrctag = None
         fcrcdata = None
 
-        # parse tags
+        # parse tags, note we checksum through a memoryview to avoid copying
+        # every tag just to crc it
         corrupt = False
         tag = Tag(0xffffffff)
         off = 4
         self.log = []
         self.all_ = []
-        while len(block) - off >= 4:
-            ntag, = struct.unpack('>I', block[off:off+4])
-
-            tag = Tag((int(tag) ^ ntag) & 0x7fffffff)
+        block_ = memoryview(block)
+        block_size = len(block)
+        ccrc_mask, ccrc_type = TAG_TYPES['ccrc']
+        fcrc_mask, fcrc_type = TAG_TYPES['fcrc']
+        while block_size - off >= 4:
+            ntag, = BE32.unpack_from(block, off)
+
+            # decode the tag's type/size inline, this is the hot loop and
+            # going through Tag's properties adds up
+            itag = (int(tag) ^ ntag) & 0x7fffffff
+            type = (itag & 0x7ff00000) >> 20
+            size = itag & 0x000003ff
+            dsize = 4 + (size if size != 0x3ff else 0)
+            isccrc = (type & ccrc_mask) == ccrc_type
+
+            tag = Tag(itag)
             tag.off = off + 4
-            tag.data = block[off+4:off+tag.dsize]
-            if tag.is_('ccrc'):
-                crc = binascii.crc32(block[off:off+2*4], crc)
+            tag.data = block[off+4:off+dsize]
+            if isccrc:
+                crc = binascii.crc32(block_[off:off+2*4], crc)
             else:
-                crc = binascii.crc32(block[off:off+tag.dsize], crc)
+                crc = binascii.crc32(block_[off:off+dsize], crc)
             tag.crc = crc
-            off += tag.dsize
+            off += dsize
 
             self.all_.append(tag)
 
-            if tag.is_('fcrc') and len(tag.data) == 8:
+            if (type & fcrc_mask) == fcrc_type and len(tag.data) == 8:
                 fcrctag = tag
                 fcrcdata = struct.unpack('<II', tag.data)
-            elif tag.is_('ccrc'):
+            elif isccrc:
                 # is valid commit?
                 if crc != 0xffffffff:
                     corrupt = True
@@ -226,17 +272,24 @@ class MetadataPair:
                     if fcrcdata:
                         fcrcsize, fcrc = fcrcdata
                         fcrc_ = 0xffffffff ^ binascii.crc32(
-                            block[off:off+fcrcsize])
+                            block_[off:off+fcrcsize])
                         if fcrc_ == fcrc:
                             fcrctag.erased = True
                             corrupt = True
 
                 # reset tag parsing
                 crc = 0
-                tag = Tag(int(tag) ^ ((tag.type & 1) << 31))
+                tag = Tag(int(tag) ^ ((type & 1) << 31))
                 fcrctag = None
                 fcrcdata = None
 
+        # lookups walk the log backwards and need a handful of fields from
+        # each tag, decode these once here instead of on every lookup
+        self.rlog = [
+            (tag, int(tag), tag.id, tag.is_('splice'), tag.is_('create'),
+                tag.schunk, tag.size)
+            for tag in reversed(self.log)]
+
         # find active ids
         self.ids = list(it.takewhile(
             lambda id: Tag('name', id, 0) in self,
@@ -284,25 +337,54 @@ class MetadataPair:
         else:
             gmask, gtag = args.mkmask(), args
 
+        # the log doesn't change after parsing, so we can cache lookups,
+        # this matters since finding the most recent tags looks up each
+        # tag multiple times
+        key = (int(gmask), int(gtag))
+        if key not in self.lookups:
+            self.lookups[key] = self._lookup(gmask, gtag)
+        tag = self.lookups[key]
+        if tag is None:
+            raise KeyError(gmask, gtag)
+        return tag
+
+    def _lookup(self, gmask, gtag):
+        # this is equivalent to int(gtag.chid(id)), but avoids allocating
+        # a new Tag at every step
+        gmask_ = int(gmask)
+        gtag_ = int(gtag) & 0x7ff003ff
+        gid = gtag.id
+        splicing = gmask.id != 0
+
         gdiff = 0
-        for tag in reversed(self.log):
-            if (gmask.id != 0 and tag.is_('splice') and
-                    tag.id <= gtag.id - gdiff):
-                if tag.is_('create') and tag.id == gtag.id - gdiff:
+        for tag, itag, id, splice, create, schunk, size in self.rlog:
+            if (splicing and splice and
+                    id <= gid - gdiff):
+                if create and id == gid - gdiff:
                     # creation point
                     break
 
-                gdiff += tag.schunk
+                gdiff += schunk
 
-            if ((int(gmask) & int(tag)) ==
-                    (int(gmask) & int(gtag.chid(gtag.id - gdiff)))):
-                if tag.size == 0x3ff:
+            if ((gmask_ & itag) ==
+                    (gmask_ & (gtag_ | ((gid - gdiff) << 10)))):
+                if size == 0x3ff:
                     # deleted
                     break
 
                 return tag
 
-        raise KeyError(gmask, gtag)
+        return None
+
+    def find_tail(self):
+        # find the tail pointer, if there is a valid one
+        try:
+            tail = self[Tag('tail', 0, 0)]
+        except KeyError:
+            return None
+        if tail.size != 8 or tail.data == 8*b'\xff':
+            return None
+        return tail
 
     def _dump_tags(self, tags, f=sys.stdout, truncate=True):
         f.write("%-8s  %-8s  %-13s %4s %4s" % (
@@ -316,18 +398,15 @@ class MetadataPair:
                 tag.off, tag,
                 tag.typerepr(), tag.idrepr(), tag.sizerepr()))
             if truncate:
-                f.write("  %-23s  %-8s\n" % (
-                    ' '.join('%02x' % c for c in tag.data[:8]),
-                    ''.join(c if c >= ' ' and c <= '~' else '.'
-                        for c in map(chr, tag.data[:8]))))
+                data = tag.data[:8]
+                f.write("  %-23s  %-8s\n" % (data.hex(' '), printable(data)))
             else:
                 f.write("\n")
                 for i in range(0, len(tag.data), 16):
                     f.write("  %08x: %-47s  %-16s\n" % (
                         tag.off+i,
-                        ' '.join('%02x' % c for c in tag.data[i:i+16]),
-                        ''.join(c if c >= ' ' and c <= '~' else '.'
-                            for c in map(chr, tag.data[i:i+16]))))
+                        tag.data[i:i+16].hex(' '),
+                        printable(tag.data[i:i+16])))
 
     def dump_tags(self, f=sys.stdout, truncate=True):
         self._dump_tags(self.tags, f=f, truncate=truncate)
@@ -341,22 +420,17 @@ class MetadataPair:
 def main(args):
     blocks = []
     with open(args.disk, 'rb') as f:
+        # map the disk instead of seeking/reading every block, if we can
+        disk = mmap_disk(f)
         for block in [args.block1, args.block2]:
             if block is None:
                 continue
-            f.seek(block * args.block_size)
-            blocks.append(f.read(args.block_size)
-                .ljust(args.block_size, b'\xff'))
+            blocks.append(read_block(f, disk, args.block_size, block))
 
     # find most recent pair
     mdir = MetadataPair(blocks)
 
-    try:
-        mdir.tail = mdir[Tag('tail', 0, 0)]
-        if mdir.tail.size != 8 or mdir.tail.data == 8*b'\xff':
-            mdir.tail = None
-    except KeyError:
-        mdir.tail = None
+    mdir.tail = mdir.find_tail()
 
     print("mdir {%s} rev %d%s%s%s" % (
         ', '.join('%#x' % b
@@ -4,46 +4,43 @@ import struct
 import sys
 import json
 import io
-import itertools as it
-from readmdir import Tag, MetadataPair
+import collections as co
+from readmdir import Tag, MetadataPair, mmap_disk, read_block
 
 def main(args):
     superblock = None
     gstate = b'\0\0\0\0\0\0\0\0\0\0\0\0'
     dirs = []
+    dirtable = {}
     mdirs = []
     corrupted = []
     cycle = False
+    # blocks of every mdir seen so far, keyed by the unordered pair
+    seen = {}
     with open(args.disk, 'rb') as f:
+        # map the disk instead of seeking/reading every block, if we can
+        disk = mmap_disk(f)
         tail = (args.block1, args.block2)
         hard = False
         while True:
-            for m in it.chain((m for d in dirs for m in d), mdirs):
-                if set(m.blocks) == set(tail):
-                    # cycle detected
-                    cycle = m.blocks
+            cycle = seen.get(frozenset(tail), False)
             if cycle:
+                # cycle detected
                 break
 
             # load mdir
             data = []
             blocks = {}
             for block in tail:
-                f.seek(block * args.block_size)
-                data.append(f.read(args.block_size)
-                    .ljust(args.block_size, b'\xff'))
+                data.append(read_block(f, disk, args.block_size, block))
                 blocks[id(data[-1])] = block
 
             mdir = MetadataPair(data)
             mdir.blocks = tuple(blocks[id(p.data)] for p in mdir.pair)
+            seen[frozenset(mdir.blocks)] = mdir.blocks
 
             # fetch some key metadata as a we scan
-            try:
-                mdir.tail = mdir[Tag('tail', 0, 0)]
-                if mdir.tail.size != 8 or mdir.tail.data == 8*b'\xff':
-                    mdir.tail = None
-            except KeyError:
-                mdir.tail = None
+            mdir.tail = mdir.find_tail()
 
             # have superblock?
             try:
@@ -56,8 +53,11 @@ def main(args):
             # have gstate?
             try:
                 ngstate = mdir[Tag('movestate', 0, 0)]
-                gstate = bytes((a or 0) ^ (b or 0)
-                    for a,b in it.zip_longest(gstate, ngstate.data))
+                # xor as little-endian ints, this zero-extends the shorter
+                # of the two and keeps the per-byte work in C
+                gstate = (int.from_bytes(gstate, 'little')
+                    ^ int.from_bytes(ngstate.data, 'little')).to_bytes(
+                        max(len(gstate), len(ngstate.data)), 'little')
             except KeyError:
                 pass
 
@@ -69,6 +69,7 @@ def main(args):
             mdirs.append(mdir)
             if mdir.tail is None or not mdir.tail.is_('hardtail'):
                 dirs.append(mdirs)
+                dirtable[frozenset(mdirs[0].blocks)] = mdirs
                 mdirs = []
 
             if mdir.tail is None:
@@ -78,24 +79,21 @@ def main(args):
             hard = mdir.tail.is_('hardtail')
 
     # find paths
-    dirtable = {}
-    for dir in dirs:
-        dirtable[frozenset(dir[0].blocks)] = dir
-
-    pending = [("/", dirs[0])]
+    pending = co.deque([("/", dirs[0])])
     while pending:
-        path, dir = pending.pop(0)
+        path, dir = pending.popleft()
         for mdir in dir:
             for tag in mdir.tags:
                 if tag.is_('dir'):
                     try:
-                        npath = tag.data.decode('utf8')
                         dirstruct = mdir[Tag('dirstruct', tag.id, 0)]
                         nblocks = struct.unpack('<II', dirstruct.data)
                         nmdir = dirtable[frozenset(nblocks)]
-                        pending.append(((path + '/' + npath), nmdir))
                     except KeyError:
-                        pass
+                        continue
+                    # only decode names we actually follow
+                    npath = tag.data.decode('utf8')
+                    pending.append(((path + '/' + npath), nmdir))
 
         dir[0].path = path.replace('//', '/')
 
@@ -109,7 +107,7 @@ def main(args):
         if not any([args.no_truncate, args.log, args.all]) else ""))
 
     # print gstate
-    print("gstate 0x%s" % ''.join('%02x' % c for c in gstate))
+    print("gstate 0x%s" % gstate.hex())
     tag = Tag(struct.unpack('<I', gstate[0:4].ljust(4, b'\xff'))[0])
     blocks = struct.unpack('<II', gstate[4:4+8].ljust(8, b'\xff'))
     if tag.size or not tag.isvalid:
@@ -138,13 +136,16 @@ def main(args):
             else:
                 mdir.dump_tags(f, truncate=not args.no_truncate)
 
+            # prefix and write the dump in one go rather than a print per line
             lines = list(filter(None, f.getvalue().split('\n')))
-            for k, line in enumerate(lines):
-                print("%s %s" % (
-                    ' ' if j == len(dir)-1 else
-                    'v' if k == len(lines)-1 else
-                    '|',
-                    line))
+            if j == len(dir)-1:
+                prefix, last = ' ', ' '
+            else:
+                prefix, last = '|', 'v'
+            sys.stdout.write(''.join("%s %s\n" % (prefix, line)
+                for line in lines[:-1]))
+            if lines:
+                sys.stdout.write("%s %s\n" % (last, lines[-1]))
 
     errcode = 0
     for mdir in corrupted: